@@ -1,14 +1,26 @@
+from collections import OrderedDict
 from enum import Enum, IntEnum
-from threading import Timer, Lock
-from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from threading import Event, Lock, Thread
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+)
 import pyVoIP
 import hashlib
 import socket
-import random
 import re
+import secrets
+import selectors
+import string
 import time
 import uuid
-import select
 import warnings
 
 
@@ -29,6 +41,19 @@ __all__ = [
 
 debug = pyVoIP.debug
 
+# Patterns used by SIPMessage, compiled once for every message parsed.
+_AUTH_MATCH = re.compile(r"(\w+)=(\"[^\",\s+]+\"|[^ \t]+)")
+_VIA_SPLIT = re.compile(" |;")
+_CONTACT_SPLIT = re.compile(r"<?sip:")
+_RTPMAP_SPLIT = re.compile(" |/")
+
+
+def _escape_braces(value: Any) -> str:
+    """
+    Escape a value so it can be baked into a str.format template.
+    """
+    return str(value).replace("{", "{{").replace("}", "}}")
+
 
 class InvalidAccountInfoError(Exception):
     pass
@@ -55,7 +80,9 @@ class Counter:
 
 
 class SIPStatus(Enum):
-    def __new__(cls, value: int, phrase: str = "", description: str = ""):
+    def __new__(
+        cls, value: int, phrase: str = "", description: str = ""
+    ) -> "SIPStatus":
         obj = object.__new__(cls)
         obj._value_ = value
 
@@ -321,7 +348,7 @@ class SIPStatus(Enum):
 
 
 class SIPMessageType(IntEnum):
-    def __new__(cls, value: int):
+    def __new__(cls, value: int) -> "SIPMessageType":
         obj = int.__new__(cls, value)
         obj._value_ = value
         return obj
@@ -336,12 +363,12 @@ class SIPMessage:
         self.SIPCompatibleMethods = pyVoIP.SIPCompatibleMethods
         self.heading = b""
         self.type: Optional[SIPMessageType] = None
-        self.status = SIPStatus(491)
+        self.status = SIPStatus.REQUEST_PENDING
         self.headers: Dict[str, Any] = {"Via": []}
         self.body: Dict[str, Any] = {}
         self.authentication: Dict[str, str] = {}
         self.raw = data
-        self.auth_match = re.compile(r"(\w+)=(\"[^\",\s+]+\"|[^ \t]+)")
+        self.auth_match = _AUTH_MATCH
         self.parse(data)
 
     def summary(self) -> str:
@@ -364,22 +391,15 @@ class SIPMessage:
         return data
 
     def parse(self, data: bytes) -> None:
-        try:
-            headers, body = data.split(b"\r\n\r\n")
-        except ValueError as ve:
-            debug(f"Error unpacking data, only using header: {ve}")
-            headers = data.split(b"\r\n\r\n")[0]
-
-        headers_raw = headers.split(b"\r\n")
-        heading = headers_raw.pop(0)
-        check = str(heading.split(b" ")[0], "utf8")
+        heading = data.partition(b"\r\n")[0]
+        check = str(heading.partition(b" ")[0], "utf8")
 
         if check in self.SIPCompatibleVersions:
             self.type = SIPMessageType.RESPONSE
-            self.parseSIPResponse(data)
+            self.parse_sip_response(data)
         elif check in self.SIPCompatibleMethods:
             self.type = SIPMessageType.MESSAGE
-            self.parseSIPMessage(data)
+            self.parse_sip_message(data)
         else:
             raise SIPParseError(
                 "Unable to decipher SIP request: " + str(heading, "utf8")
@@ -397,7 +417,7 @@ class SIPMessage:
     def parse_header(self, header: str, data: str) -> None:
         if header == "Via":
             for d in data:
-                info = re.split(" |;", d)
+                info = _VIA_SPLIT.split(d)
                 _type = info[0]  # SIP Method
                 _address = info[1].split(":")  # Tuple: address, port
                 _ip = _address[0]
@@ -406,7 +426,7 @@ class SIPMessage:
                 If no port is provided in via header assume default port.
                 Needs to be str. Check response build for better str creation
                 """
-                _port = info[1].split(":")[1] if len(_address) > 1 else "5060"
+                _port = _address[1] if len(_address) > 1 else "5060"
                 _via = {"type": _type, "address": (_ip, _port)}
 
                 """
@@ -414,10 +434,8 @@ class SIPMessage:
                 as per RFC 3261 20.7
                 """
                 for x in info[2:]:
-                    if "=" in x:
-                        _via[x.split("=")[0]] = x.split("=")[1]
-                    else:
-                        _via[x] = None
+                    key, sep, value = x.partition("=")
+                    _via[key] = value if sep else None
                 self.headers["Via"].append(_via)
         elif header == "From" or header == "To":
             info = data.split(";tag=")
@@ -426,7 +444,7 @@ class SIPMessage:
                 tag = info[1]
             raw = info[0]
             # fix issue 41 part 1
-            contact = re.split(r"<?sip:", raw)
+            contact = _CONTACT_SPLIT.split(raw)
             contact[0] = contact[0].strip('"').strip("'")
             address = contact[1].strip(">")
             if len(address.split("@")) == 2:
@@ -614,7 +632,7 @@ class SIPMessage:
                     d = data.split(":")
                     self.body[header] = {"method": d[0], "key": d[1]}
                 else:
-                    self.body[header] = {"method": d}
+                    self.body[header] = {"method": data}
             elif header == "m":
                 # SDP 5.14 Media Descriptions
                 # m=<media> <port>/<number of ports> <proto> <fmt> ...
@@ -665,7 +683,7 @@ class SIPMessage:
                 if value is not None:
                     if attribute == "rtpmap":
                         # a=rtpmap:<payload type> <encoding name>/<clock rate> [/<encoding parameters>] # noqa: E501
-                        v = re.split(" |/", value)
+                        v = _RTPMAP_SPLIT.split(value)
                         for t in self.body["m"]:
                             if v[0] in t["methods"]:
                                 index = int(self.body["m"].index(t))
@@ -755,7 +773,9 @@ class SIPMessage:
         return self.parse_sip_response(data)
 
     def parse_sip_response(self, data: bytes) -> None:
-        headers, body = data.split(b"\r\n\r\n")
+        # UDP delivers one message per datagram, so everything after the
+        # first blank line is the body.
+        headers, _, body = data.partition(b"\r\n\r\n")
 
         headers_raw = headers.split(b"\r\n")
         self.heading = headers_raw.pop(0)
@@ -779,7 +799,7 @@ class SIPMessage:
         return self.parse_sip_message(data)
 
     def parse_sip_message(self, data: bytes) -> None:
-        headers, body = data.split(b"\r\n\r\n")
+        headers, _, body = data.partition(b"\r\n\r\n")
 
         headers_raw = headers.split(b"\r\n")
         self.heading = headers_raw.pop(0)
@@ -794,6 +814,40 @@ class SIPMessage:
         self.parse_raw_body(body, self.parseBody)
 
 
+# Largest SIP datagram we read. UDP truncates anything longer, and
+# INVITEs with large SDP bodies can exceed 8 KiB.
+_SIP_RECV_BUFSIZE = 16384
+
+# Most datagrams the receive thread handles per wakeup before it lets
+# others take recvLock.
+_SIP_RECV_BATCH = 32
+
+# Kernel send/receive buffer size for the SIP socket, so bursts of
+# responses are not dropped while the receive thread is busy.
+_SIP_SOCKET_BUFSIZE = 262144
+
+# Random bytes SIPClient reads at once for tags and branches.
+_RANDOM_POOL_SIZE = 4096
+
+# Number of server nonces SIPClient keeps a nonce count for.
+_MAX_NONCES = 256
+
+# How often REGISTER is sent after 500 Server Internal Error responses,
+# and the longest wait in seconds between two attempts.
+_REGISTER_ATTEMPTS = 5
+_REGISTER_MAX_BACKOFF = 30
+
+# Responses that are handed to callCallback, and provisional responses
+# which need no handling outside of the request that caused them.
+_CALLBACK_STATUSES = frozenset(
+    {SIPStatus.OK, SIPStatus.NOT_FOUND, SIPStatus.SERVICE_UNAVAILABLE}
+)
+_PROVISIONAL_STATUSES = frozenset({SIPStatus.TRYING, SIPStatus.RINGING})
+
+# Responses to our INVITE that invite() acts on itself.
+_INVITE_RESPONSE_STATUSES = _PROVISIONAL_STATUSES | {SIPStatus.UNAUTHORIZED}
+
+
 class SIPClient:
     def __init__(
         self,
@@ -801,10 +855,10 @@ class SIPClient:
         port: int,
         username: str,
         password: str,
-        myIP="0.0.0.0",
-        myPort=5060,
+        myIP: str = "0.0.0.0",
+        myPort: int = 5060,
         callCallback: Optional[Callable[[SIPMessage], None]] = None,
-    ):
+    ) -> None:
         self.NSD = False
         self.server = server
         self.port = port
@@ -814,10 +868,16 @@ class SIPClient:
 
         self.callCallback = callCallback
 
-        self.tags: List[str] = []
+        self.tags: Set[str] = set()
+        # Tags and branches are cut from one block of random bytes at a
+        # time. The lock keeps two threads from getting the same slice.
+        self._random_pool = bytearray()
+        self._random_lock = Lock()
         self.tagLibrary = {"register": self.genTag()}
 
         self.myPort = myPort
+        # Our address as it appears in Via, Contact and Call-ID.
+        self._bind_addr = f"{self.myIP}:{self.myPort}"
 
         self.default_expires = 120
         self.register_timeout = 30
@@ -827,48 +887,212 @@ class SIPClient:
         self.subscribeCounter = Counter()
         self.byeCounter = Counter()
         self.callID = Counter()
+        # Call-IDs are this random prefix followed by the callID counter,
+        # unique per client without hashing anything.
+        self._call_id_prefix = uuid.uuid4().hex[:24]
         self.sessID = Counter()
-        self.nonce_count = Counter()
+        # Nonce counts per server nonce, oldest nonces are dropped first.
+        self.nc: "OrderedDict[str, Counter]" = OrderedDict()
+        # HA1 only depends on the credentials and the realm. The password
+        # is part of the key so changing credentials never hits a stale
+        # entry.
+        self._ha1_cache: Dict[Tuple[str, str, str, str], str] = {}
+        # HA2 only depends on the method and the request URI.
+        self._ha2_cache: Dict[Tuple[str, str], str] = {}
 
         self.urnUUID = self.gen_urn_uuid()
 
-        self.registerThread: Optional[Timer] = None
+        # Constant header lines, built once instead of on every message.
+        self._allow_hdr = (
+            f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
+        )
+        self._ua_hdr = f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
+        self._contact_hdr = (
+            f"Contact: <sip:{self.username}@{self._bind_addr}>\r\n"
+        )
+        # Our From headers only differ in the tag between requests.
+        self._from_prefix = (
+            f'From: "{self.username}" <sip:{self.username}@{self.server}>;'
+            + "tag="
+        )
+        self._invite_from_prefix = (
+            f"From: <sip:{self.username}@{self.myIP}>;tag="
+        )
+
+        # Message templates. Everything known at this point is baked in,
+        # the per-message values are filled in with str.format_map.
+        username = _escape_braces(self.username)
+        server = _escape_braces(self.server)
+        address = _escape_braces(self._bind_addr)
+        ua_hdr = _escape_braces(self._ua_hdr)
+        allow_hdr = _escape_braces(self._allow_hdr)
+        self._register_tmpl = (
+            f"REGISTER sip:{server} SIP/2.0\r\n"
+            + f"Via: SIP/2.0/UDP {address};branch={{branch}};rport\r\n"
+            + f'From: "{username}" <sip:{username}@{server}>;tag='
+            + f"{_escape_braces(self.tagLibrary['register'])}\r\n"
+            + f'To: "{username}" <sip:{username}@{server}>\r\n'
+            + "Call-ID: {call_id}\r\n"
+            + "CSeq: {cseq} REGISTER\r\n"
+            + f"Contact: <sip:{username}@{address};transport=UDP>;"
+            + f'+sip.instance="<urn:uuid:{self.urnUUID}>"\r\n'
+            + allow_hdr
+            + "Max-Forwards: 70\r\n"
+            + "Allow-Events: org.3gpp.nwinitdereg\r\n"
+            + ua_hdr
+            # Supported: 100rel, replaces, from-change, gruu
+            + "Expires: {expires}\r\n"
+            + "{auth}Content-Length: 0\r\n\r\n"
+        )
+        # The unauthenticated REGISTER is also kept as encoded fragments
+        # around its branch, Call-ID, CSeq and Expires values.
+        self._register_parts = [b""]
+        for literal, field, _, _ in string.Formatter().parse(
+            self._register_tmpl
+        ):
+            self._register_parts[-1] += literal.encode("utf8")
+            if field is not None and field != "auth":
+                self._register_parts.append(b"")
+        response_hdrs = (
+            "{via}From: {from_raw};tag={from_tag}\r\n"
+            + "To: {to_raw};tag={to_tag}\r\n"
+            + "Call-ID: {call_id}\r\n"
+            + "CSeq: {cseq} {method}\r\n"
+        )
+        self._ok_tmpl = (
+            "SIP/2.0 200 OK\r\n"
+            + response_hdrs
+            + ua_hdr
+            + allow_hdr
+            + "Content-Length: 0\r\n\r\n"
+        )
+        # TODO: Add Supported
+        self._busy_tmpl = (
+            "SIP/2.0 486 Busy Here\r\n"
+            + response_hdrs
+            + "Contact: {contact}\r\n"
+            + ua_hdr
+            + 'Warning: 399 GS "Unable to accept call"\r\n'
+            + allow_hdr
+            + "Content-Length: 0\r\n\r\n"
+        )
+        # TODO: Add Supported
+        self._ringing_tmpl = (
+            "SIP/2.0 180 Ringing\r\n"
+            + response_hdrs
+            + "Contact: {contact}\r\n"
+            + ua_hdr
+            + allow_hdr
+            + "Content-Length: 0\r\n\r\n"
+        )
+
+        self._method_handlers: Dict[str, Callable[[SIPMessage], None]] = {
+            "INVITE": self._handle_invite,
+            "BYE": self._handle_bye,
+            "ACK": self._handle_ack,
+            "CANCEL": self._handle_cancel,
+        }
+
+        self.registerThread: Optional[Thread] = None
+        # Last challenge to our REGISTER, answered up front on refresh.
+        self._register_challenge: Optional[SIPMessage] = None
+        # Set by stop() to wake the REGISTER thread and end it.
+        self._stop_event = Event()
         self.recvLock = Lock()
+        # Datagrams are read into this buffer while holding recvLock.
+        self._recv_buf = memoryview(bytearray(_SIP_RECV_BUFSIZE))
 
     def recv(self) -> None:
-        while self.NSD:
-            self.recvLock.acquire()
-            self.s.setblocking(False)
-            try:
-                raw = self.s.recv(8192)
-                if raw != b"\x00\x00\x00\x00":
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.s, selectors.EVENT_READ)
+            while self.NSD:
+                try:
+                    ready = selector.select(timeout=0.5)
+                except (OSError, ValueError):
+                    # stop() closed the socket while we were waiting on it.
+                    if not self.NSD:
+                        break
+                    raise
+                if not ready:
+                    continue
+                self.recvLock.acquire()
+                if not self.NSD:
+                    # stop() ran while we waited for the lock.
+                    self.recvLock.release()
+                    break
+                self.s.setblocking(False)
+                # Handle everything that is already queued before going
+                # back to the selector, but give the lock back now and then.
+                for _ in range(_SIP_RECV_BATCH):
+                    if not self.NSD:
+                        break
                     try:
-                        message = SIPMessage(raw)
-                        debug(message.summary())
-                        self.parseMessage(message)
-                    except Exception as ex:
-                        debug(f"Error on header parsing: {ex}")
-            except BlockingIOError:
-                self.s.setblocking(True)
+                        raw = self._recv_datagram()
+                        if raw != b"\x00\x00\x00\x00":
+                            try:
+                                message = SIPMessage(raw)
+                                debug(message.summary())
+                                self.parseMessage(message)
+                            except Exception as ex:
+                                debug(f"Error on header parsing: {ex}")
+                    except BlockingIOError:
+                        # Drained, or whoever held recvLock consumed the
+                        # datagram first.
+                        break
+                    except SIPParseError as e:
+                        if "SIP Version" in str(e):
+                            request = self.genSIPVersionNotSupported(message)
+                            self._send(request)
+                        else:
+                            debug(f"SIPParseError in SIP.recv: {type(e)}, {e}")
+                    except Exception as e:
+                        debug(
+                            f"SIP.recv error: {type(e)}, {e}\n\n"
+                            + f"{str(raw, 'utf8')}"
+                        )
+                        if pyVoIP.DEBUG:
+                            self.s.setblocking(True)
+                            self.recvLock.release()
+                            raise
+                if self.NSD:
+                    self.s.setblocking(True)
                 self.recvLock.release()
-                time.sleep(0.01)
+
+    def _recv_datagram(self) -> bytes:
+        """
+        Reads one datagram. Must be called with recvLock held.
+        """
+        size = self.s.recv_into(self._recv_buf)
+        return bytes(self._recv_buf[:size])
+
+    def _recv_sip(self, call_id: str, timeout: float) -> Optional[SIPMessage]:
+        """
+        Waits up to timeout seconds for a message belonging to call_id.
+        Messages for other dialogs are handled as if recv had read them.
+        Must be called with recvLock held. Returns None on timeout.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if not self._selector.select(remaining):
+                return None
+            try:
+                raw = self._recv_datagram()
+            except BlockingIOError:
                 continue
-            except SIPParseError as e:
-                if "SIP Version" in str(e):
-                    request = self.genSIPVersionNotSupported(message)
-                    self.out.sendto(
-                        request.encode("utf8"), (self.server, self.port)
-                    )
-                else:
-                    debug(f"SIPParseError in SIP.recv: {type(e)}, {e}")
-            except Exception as e:
-                debug(f"SIP.recv error: {type(e)}, {e}\n\n{str(raw, 'utf8')}")
-                if pyVoIP.DEBUG:
-                    self.s.setblocking(True)
-                    self.recvLock.release()
-                    raise
-            self.s.setblocking(True)
-            self.recvLock.release()
+            if raw == b"\x00\x00\x00\x00":
+                # Keep-alive, same as in recv.
+                continue
+            try:
+                message = SIPMessage(raw)
+            except Exception as ex:
+                debug(f"Error on header parsing: {ex}")
+                continue
+            if message.headers.get("Call-ID") == call_id:
+                return message
+            self.parseMessage(message)
 
     def parseMessage(self, message: SIPMessage) -> None:
         warnings.warn(
@@ -881,86 +1105,122 @@ class SIPClient:
 
     def parse_message(self, message: SIPMessage) -> None:
         if message.type != SIPMessageType.MESSAGE:
-            if message.status == SIPStatus.OK:
-                if self.callCallback is not None:
-                    self.callCallback(message)
-            elif message.status == SIPStatus.NOT_FOUND:
+            if message.status in _CALLBACK_STATUSES:
                 if self.callCallback is not None:
                     self.callCallback(message)
-            elif message.status == SIPStatus.SERVICE_UNAVAILABLE:
-                if self.callCallback is not None:
-                    self.callCallback(message)
-            elif (
-                message.status == SIPStatus.TRYING
-                or message.status == SIPStatus.RINGING
-            ):
-                pass
-            else:
+            elif message.status not in _PROVISIONAL_STATUSES:
                 debug(
                     "TODO: Add 500 Error on Receiving SIP Response:\r\n"
                     + message.summary(),
                     "TODO: Add 500 Error on Receiving SIP Response",
                 )
-            self.s.setblocking(True)
             return
-        elif message.method == "INVITE":
-            if self.callCallback is None:
-                request = self.genBusy(message)
-                self.out.sendto(
-                    request.encode("utf8"), (self.server, self.port)
-                )
-            else:
-                self.callCallback(message)
-        elif message.method == "BYE":
-            # TODO: If callCallback is None, the call doesn't exist, 481
-            self.callCallback(message)  # type: ignore
-            response = self.genOk(message)
-            try:
-                # BYE comes from client cause server only acts as mediator
-                (_sender_adress, _sender_port) = message.headers["Via"][0][
-                    "address"
-                ]
-                self.out.sendto(
-                    response.encode("utf8"),
-                    (_sender_adress, int(_sender_port)),
-                )
-            except Exception:
-                debug("BYE Answer failed falling back to server as target")
-                self.out.sendto(
-                    response.encode("utf8"), (self.server, self.port)
-                )
-        elif message.method == "ACK":
+        handler = self._method_handlers.get(message.method)
+        if handler is None:
+            debug("TODO: Add 400 Error on non processable request")
             return
-        elif message.method == "CANCEL":
-            # TODO: If callCallback is None, the call doesn't exist, 481
-            self.callCallback(message)  # type: ignore
-            response = self.genOk(message)
-            self.out.sendto(response.encode("utf8"), (self.server, self.port))
+        handler(message)
+
+    def _handle_invite(self, message: SIPMessage) -> None:
+        if self.callCallback is None:
+            request = self.genBusy(message)
+            self._send(request)
         else:
-            debug("TODO: Add 400 Error on non processable request")
+            self.callCallback(message)
+
+    def _handle_bye(self, message: SIPMessage) -> None:
+        # TODO: If callCallback is None, the call doesn't exist, 481
+        self.callCallback(message)  # type: ignore
+        response = self.genOk(message)
+        try:
+            # BYE comes from client cause server only acts as mediator
+            _sender_adress, _sender_port = message.headers["Via"][0]["address"]
+            self._send(response, (_sender_adress, int(_sender_port)))
+        except Exception:
+            debug("BYE Answer failed falling back to server as target")
+            self._send(response)
+
+    def _handle_ack(self, message: SIPMessage) -> None:
+        pass
+
+    def _handle_cancel(self, message: SIPMessage) -> None:
+        # TODO: If callCallback is None, the call doesn't exist, 481
+        self.callCallback(message)  # type: ignore
+        response = self.genOk(message)
+        self._send(response)
+
+    def _send(
+        self,
+        message: Union[str, bytes],
+        address: Optional[Tuple[str, int]] = None,
+    ) -> None:
+        """
+        Send a SIP message, to the server unless an address is given.
+        Messages already encoded to bytes are sent without a copy.
+        """
+        if isinstance(message, str):
+            message = message.encode("utf8")
+        if address is None:
+            address = (self.server, self.port)
+        self.out.sendto(message, address)
+
+    def _send_batch(
+        self,
+        messages: List[Union[str, bytes]],
+        address: Optional[Tuple[str, int]] = None,
+    ) -> None:
+        """
+        Send several messages back to back. All of them are encoded before
+        the first one goes out. Over UDP every SIP message still needs its
+        own datagram.
+        """
+        datagrams = [
+            m.encode("utf8") if isinstance(m, str) else m for m in messages
+        ]
+        for datagram in datagrams:
+            self._send(datagram, address)
 
     def start(self) -> None:
         if self.NSD:
             raise RuntimeError("Attempted to start already started SIPClient")
         self.NSD = True
         self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.s.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF, _SIP_SOCKET_BUFSIZE
+        )
+        self.s.setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, _SIP_SOCKET_BUFSIZE
+        )
         # self.out = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.s.bind((self.myIP, self.myPort))
         self.out = self.s
+        # Used by _recv_sip, the receive thread keeps its own selector.
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.s, selectors.EVENT_READ)
+        self._stop_event.clear()
         self.register()
-        t = Timer(1, self.recv)
-        t.name = "SIP Recieve"
+        self.registerThread = Thread(
+            target=self._register_loop, name="SIP Register", daemon=True
+        )
+        self.registerThread.start()
+        t = Thread(target=self.recv, name="SIP Receive", daemon=True)
         t.start()
 
     def stop(self) -> None:
         self.NSD = False
+        self._stop_event.set()
         if self.registerThread:
             # Only run if registerThread exists
-            self.registerThread.cancel()
+            # Let a refresh that is already running finish before the
+            # DE-REGISTER goes out and the socket is closed.
+            self.registerThread.join(timeout=self.register_timeout)
+            self.registerThread = None
             self.deregister()
         self._close_sockets()
 
     def _close_sockets(self) -> None:
+        if hasattr(self, "_selector"):
+            self._selector.close()
         if hasattr(self, "s"):
             if self.s:
                 self.s.close()
@@ -978,9 +1238,8 @@ class SIPClient:
         return self.gen_call_id()
 
     def gen_call_id(self) -> str:
-        hash = hashlib.sha256(str(self.callID.next()).encode("utf8"))
-        hhash = hash.hexdigest()
-        return f"{hhash[0:32]}@{self.myIP}:{self.myPort}"
+        call_id = f"{self._call_id_prefix}{self.callID.next():08x}"
+        return f"{call_id}@{self._bind_addr}"
 
     def lastCallID(self) -> str:
         warnings.warn(
@@ -992,9 +1251,8 @@ class SIPClient:
         return self.gen_last_call_id()
 
     def gen_last_call_id(self) -> str:
-        hash = hashlib.sha256(str(self.callID.current() - 1).encode("utf8"))
-        hhash = hash.hexdigest()
-        return f"{hhash[0:32]}@{self.myIP}:{self.myPort}"
+        call_id = f"{self._call_id_prefix}{self.callID.current() - 1:08x}"
+        return f"{call_id}@{self._bind_addr}"
 
     def genTag(self) -> str:
         warnings.warn(
@@ -1008,10 +1266,9 @@ class SIPClient:
     def gen_tag(self) -> str:
         # Keep as True instead of NSD so it can generate a tag on deregister.
         while True:
-            rand = str(random.randint(1, 4294967296)).encode("utf8")
-            tag = hashlib.md5(rand).hexdigest()[0:8]
+            tag = self._random_hex(8)
             if tag not in self.tags:
-                self.tags.append(tag)
+                self.tags.add(tag)
                 return tag
         return ""
 
@@ -1026,30 +1283,25 @@ class SIPClient:
         return self.gen_sip_version_not_supported(request)
 
     def gen_sip_version_not_supported(self, request: SIPMessage) -> str:
+        headers = request.headers
+        from_hdr = headers["From"]
+        cseq_hdr = headers["CSeq"]
         # TODO: Add Supported
-        response = "SIP/2.0 505 SIP Version Not Supported\r\n"
-        response += self._gen_response_via_header(request)
-        response += (
-            f"From: {request.headers['From']['raw']};tag="
-            + f"{request.headers['From']['tag']}\r\n"
-        )
-        response += (
-            f"To: {request.headers['To']['raw']};tag=" + f"{self.genTag()}\r\n"
-        )
-        response += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        response += (
-            f"CSeq: {request.headers['CSeq']['check']} "
-            + f"{request.headers['CSeq']['method']}\r\n"
-        )
-        response += f"Contact: {request.headers['Contact']}\r\n"
-        response += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        response += 'Warning: 399 GS "Unable to accept call"\r\n'
-        response += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        response += "Content-Length: 0\r\n\r\n"
-
-        return response
-
-    def genAuthorization(self, request: SIPMessage) -> bytes:
+        response = ["SIP/2.0 505 SIP Version Not Supported\r\n"]
+        response.append(self._gen_response_via_header(request))
+        response.append(f"From: {from_hdr['raw']};tag={from_hdr['tag']}\r\n")
+        response.append(f"To: {headers['To']['raw']};tag={self.genTag()}\r\n")
+        response.append(f"Call-ID: {headers['Call-ID']}\r\n")
+        response.append(f"CSeq: {cseq_hdr['check']} {cseq_hdr['method']}\r\n")
+        response.append(f"Contact: {headers['Contact']}\r\n")
+        response.append(self._ua_hdr)
+        response.append('Warning: 399 GS "Unable to accept call"\r\n')
+        response.append(self._allow_hdr)
+        response.append("Content-Length: 0\r\n\r\n")
+
+        return "".join(response)
+
+    def genAuthorization(self, request: SIPMessage) -> str:
         warnings.warn(
             "genAuthorization is deprecated "
             + "due to PEP8 compliance. Use gen_authorization instead.",
@@ -1058,40 +1310,48 @@ class SIPClient:
         )
         return self.gen_authorization(request)
 
-    def gen_authorization(self, request):
+    def gen_authorization(self, request: SIPMessage) -> str:
         # debug('INFO', f'{self.__class__.__name__}.{inspect.stack()[0][3]} called from '
         #                 f'{inspect.stack()[1][0].f_locals["self"].__class__.__name__}.{inspect.stack()[1][3]} start')
         realm = request.authentication["realm"]
         nonce = request.authentication["nonce"]
 
-        ha1 = f"{self.username}:{realm}:{self.password}"
-        ha1 = hashlib.md5(ha1.encode("utf8")).hexdigest()
-        ha2 = f'{request.headers["CSeq"]["method"]}:sip:{self.server};transport=UDP'
-        ha2 = hashlib.md5(ha2.encode("utf8")).hexdigest()
-
-        if request.authentication.get(
-            "qop"
-        ) and "auth" in request.authentication.get("qop"):
+        key = (self.server, realm, self.username, self.password)
+        ha1 = self._ha1_cache.get(key)
+        if ha1 is None:
+            ha1 = f"{self.username}:{realm}:{self.password}"
+            ha1 = hashlib.md5(ha1.encode("utf8")).hexdigest()
+            self._ha1_cache[key] = ha1
+        method = request.headers["CSeq"]["method"]
+        uri = f"sip:{self.server};transport=UDP"
+        ha2 = self._ha2_cache.get((method, uri))
+        if ha2 is None:
+            ha2 = hashlib.md5(f"{method}:{uri}".encode("utf8")).hexdigest()
+            self._ha2_cache[(method, uri)] = ha2
+
+        qop = request.authentication.get("qop")
+        if qop and "auth" in qop:
             cnonce = self.gen_tag()
-            nonce_count = self.nonce_count.next()
-            response = (
-                f"{ha1}:{nonce}:{nonce_count:08x}:{cnonce}:auth:{ha2}".encode(
-                    "utf8"
-                )
-            )
-            response = hashlib.md5(response).hexdigest().encode("utf8")
-            response = (
+            nc = self.nc.get(nonce)
+            if nc is None:
+                if len(self.nc) >= _MAX_NONCES:
+                    self.nc.popitem(last=False)
+                nc = self.nc[nonce] = Counter()
+            else:
+                self.nc.move_to_end(nonce)
+            nonce_count = nc.next()
+            response = f"{ha1}:{nonce}:{nonce_count:08x}:{cnonce}:auth:{ha2}"
+            response = hashlib.md5(response.encode("utf8")).hexdigest()
+            return (
                 f'qop="auth",nc="{nonce_count:08x}",cnonce="{cnonce}",'
-                f'response="{str(response, "utf8")}"'
+                f'response="{response}"'
             )
-        else:
-            response = f"{ha1}:{nonce}:{ha2}".encode("utf8")
-            response = hashlib.md5(response).hexdigest().encode("utf8")
-            response = f'response="{str(response, "utf8")}"'
 
-        return response
+        response = f"{ha1}:{nonce}:{ha2}"
+        response = hashlib.md5(response.encode("utf8")).hexdigest()
+        return f'response="{response}"'
 
-    def genBranch(self, length=32) -> str:
+    def genBranch(self, length: int = 32) -> str:
         """
         Generate unique branch id according to
         https://datatracker.ietf.org/doc/html/rfc3261#section-8.1.1.7
@@ -1104,13 +1364,24 @@ class SIPClient:
         )
         return self.gen_branch(length)
 
-    def gen_branch(self, length=32) -> str:
+    def gen_branch(self, length: int = 32) -> str:
         """
         Generate unique branch id according to
         https://datatracker.ietf.org/doc/html/rfc3261#section-8.1.1.7
         """
-        branchid = uuid.uuid4().hex[: length - 7]
-        return f"z9hG4bK{branchid}"
+        return f"z9hG4bK{self._random_hex(length - 7)}"
+
+    def _random_hex(self, length: int) -> str:
+        """
+        Returns length random hex digits from the client's random pool.
+        """
+        size = (length + 1) // 2
+        with self._random_lock:
+            if len(self._random_pool) < size:
+                self._random_pool += secrets.token_bytes(_RANDOM_POOL_SIZE)
+            chunk = self._random_pool[:size]
+            del self._random_pool[:size]
+        return chunk.hex()[:length]
 
     def gen_urn_uuid(self) -> str:
         """
@@ -1118,7 +1389,7 @@ class SIPClient:
         """
         return str(uuid.uuid4()).upper()
 
-    def genFirstRequest(self, deregister=False) -> str:
+    def genFirstRequest(self, deregister: bool = False) -> str:
         warnings.warn(
             "genFirstResponse is deprecated "
             + "due to PEP8 compliance. "
@@ -1128,42 +1399,30 @@ class SIPClient:
         )
         return self.gen_first_response(deregister)
 
-    def gen_first_response(self, deregister=False) -> str:
-        regRequest = f"REGISTER sip:{self.server} SIP/2.0\r\n"
-        regRequest += (
-            f"Via: SIP/2.0/UDP {self.myIP}:{self.myPort};"
-            + f"branch={self.genBranch()};rport\r\n"
-        )
-        regRequest += (
-            f'From: "{self.username}" '
-            + f"<sip:{self.username}@{self.server}>;tag="
-            + f'{self.tagLibrary["register"]}\r\n'
-        )
-        regRequest += (
-            f'To: "{self.username}" '
-            + f"<sip:{self.username}@{self.server}>\r\n"
-        )
-        regRequest += f"Call-ID: {self.genCallID()}\r\n"
-        regRequest += f"CSeq: {self.registerCounter.next()} REGISTER\r\n"
-        regRequest += (
-            "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort};"
-            + "transport=UDP>;+sip.instance="
-            + f'"<urn:uuid:{self.urnUUID}>"\r\n'
-        )
-        regRequest += f'Allow: {(", ".join(pyVoIP.SIPCompatibleMethods))}\r\n'
-        regRequest += "Max-Forwards: 70\r\n"
-        regRequest += "Allow-Events: org.3gpp.nwinitdereg\r\n"
-        regRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        # Supported: 100rel, replaces, from-change, gruu
-        regRequest += (
-            "Expires: "
-            + f"{self.default_expires if not deregister else 0}\r\n"
+    def gen_first_response(self, deregister: bool = False) -> str:
+        call_id = self.gen_call_id()
+        return self._gen_first_request(call_id, deregister).decode("utf8")
+
+    def _gen_first_request(
+        self, call_id: str, deregister: bool = False
+    ) -> bytes:
+        head, call_id_hdr, cseq_hdr, expires_hdr, tail = self._register_parts
+        branch = self.gen_branch()
+        cseq = self.registerCounter.next()
+        expires = self.default_expires if not deregister else 0
+        return b"".join(
+            (
+                head,
+                branch.encode("utf8"),
+                call_id_hdr,
+                call_id.encode("utf8"),
+                cseq_hdr,
+                str(cseq).encode("utf8"),
+                expires_hdr,
+                str(expires).encode("utf8"),
+                tail,
+            )
         )
-        regRequest += "Content-Length: 0"
-        regRequest += "\r\n\r\n"
-
-        return regRequest
 
     def genSubscribe(self, response: SIPMessage) -> str:
         warnings.warn(
@@ -1175,37 +1434,39 @@ class SIPClient:
         return self.gen_subscribe(response)
 
     def gen_subscribe(self, response: SIPMessage) -> str:
-        subRequest = f"SUBSCRIBE sip:{self.username}@{self.server} SIP/2.0\r\n"
-        subRequest += (
-            f"Via: SIP/2.0/UDP {self.myIP}:{self.myPort};"
+        subRequest = [
+            f"SUBSCRIBE sip:{self.username}@{self.server} SIP/2.0\r\n"
+        ]
+        subRequest.append(
+            f"Via: SIP/2.0/UDP {self._bind_addr};"
             + f"branch={self.genBranch()};rport\r\n"
         )
-        subRequest += (
-            f'From: "{self.username}" '
-            + f"<sip:{self.username}@{self.server}>;tag="
-            + f"{self.genTag()}\r\n"
+        subRequest.append(f"{self._from_prefix}{self.genTag()}\r\n")
+        subRequest.append(f"To: <sip:{self.username}@{self.server}>\r\n")
+        subRequest.append(f'Call-ID: {response.headers["Call-ID"]}\r\n')
+        subRequest.append(
+            f"CSeq: {self.subscribeCounter.next()} SUBSCRIBE\r\n"
         )
-        subRequest += f"To: <sip:{self.username}@{self.server}>\r\n"
-        subRequest += f'Call-ID: {response.headers["Call-ID"]}\r\n'
-        subRequest += f"CSeq: {self.subscribeCounter.next()} SUBSCRIBE\r\n"
         # TODO: check if transport is needed
-        subRequest += (
+        subRequest.append(
             "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort};"
+            + f"<sip:{self.username}@{self._bind_addr};"
             + "transport=UDP>;+sip.instance="
             + f'"<urn:uuid:{self.urnUUID}>"\r\n'
         )
-        subRequest += "Max-Forwards: 70\r\n"
-        subRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        subRequest += f"Expires: {self.default_expires * 2}\r\n"
-        subRequest += "Event: message-summary\r\n"
-        subRequest += "Accept: application/simple-message-summary"
-        subRequest += "Content-Length: 0"
-        subRequest += "\r\n\r\n"
-
-        return subRequest
-
-    def genRegister(self, request: SIPMessage, deregister=False) -> str:
+        subRequest.append("Max-Forwards: 70\r\n")
+        subRequest.append(self._ua_hdr)
+        subRequest.append(f"Expires: {self.default_expires * 2}\r\n")
+        subRequest.append("Event: message-summary\r\n")
+        subRequest.append("Accept: application/simple-message-summary")
+        subRequest.append("Content-Length: 0")
+        subRequest.append("\r\n\r\n")
+
+        return "".join(subRequest)
+
+    def genRegister(
+        self, request: SIPMessage, deregister: bool = False
+    ) -> str:
         warnings.warn(
             "genRegister is deprecated due to PEP8 compliance. "
             + "Use gen_register instead.",
@@ -1214,52 +1475,28 @@ class SIPClient:
         )
         return self.gen_register(request, deregister)
 
-    def gen_register(self, request: SIPMessage, deregister=False) -> str:
+    def gen_register(
+        self, request: SIPMessage, deregister: bool = False
+    ) -> str:
         response = self.gen_authorization(request)
         nonce = request.authentication["nonce"]
         realm = request.authentication["realm"]
 
-        regRequest = f"REGISTER sip:{self.server} SIP/2.0\r\n"
-        regRequest += (
-            f"Via: SIP/2.0/UDP {self.myIP}:{self.myPort};branch="
-            + f"{self.genBranch()};rport\r\n"
-        )
-        regRequest += (
-            f'From: "{self.username}" '
-            + f"<sip:{self.username}@{self.server}>;tag="
-            + f'{self.tagLibrary["register"]}\r\n'
-        )
-        regRequest += (
-            f'To: "{self.username}" '
-            + f"<sip:{self.username}@{self.server}>\r\n"
-        )
-        # regRequest += f"Call-ID: {self.genCallID()}\r\n"
-        regRequest += f'Call-ID: {request.headers["Call-ID"]}\r\n'
-        regRequest += f"CSeq: {self.registerCounter.next()} REGISTER\r\n"
-        regRequest += (
-            "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort};"
-            + "transport=UDP>;+sip.instance="
-            + f'"<urn:uuid:{self.urnUUID}>"\r\n'
-        )
-        regRequest += f'Allow: {(", ".join(pyVoIP.SIPCompatibleMethods))}\r\n'
-        regRequest += "Max-Forwards: 70\r\n"
-        regRequest += "Allow-Events: org.3gpp.nwinitdereg\r\n"
-        regRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        regRequest += (
-            "Expires: "
-            + f"{self.default_expires if not deregister else 0}\r\n"
-        )
-        regRequest += (
+        auth = (
             f'Authorization: Digest username="{self.username}",'
             + f'realm="{realm}",nonce="{nonce}",'
             + f'uri="sip:{self.server};transport=UDP",'
             f"{response},algorithm=MD5\r\n"
         )
-        regRequest += "Content-Length: 0"
-        regRequest += "\r\n\r\n"
-
-        return regRequest
+        return self._register_tmpl.format_map(
+            {
+                "branch": self.genBranch(),
+                "call_id": request.headers["Call-ID"],
+                "cseq": self.registerCounter.next(),
+                "expires": self.default_expires if not deregister else 0,
+                "auth": auth,
+            }
+        )
 
     def genBusy(self, request: SIPMessage) -> str:
         warnings.warn(
@@ -1271,28 +1508,9 @@ class SIPClient:
         return self.gen_busy(request)
 
     def gen_busy(self, request: SIPMessage) -> str:
-        response = "SIP/2.0 486 Busy Here\r\n"
-        response += self._gen_response_via_header(request)
-        response += (
-            f"From: {request.headers['From']['raw']};tag="
-            + f"{request.headers['From']['tag']}\r\n"
-        )
-        response += (
-            f"To: {request.headers['To']['raw']};tag=" + f"{self.genTag()}\r\n"
-        )
-        response += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        response += (
-            f"CSeq: {request.headers['CSeq']['check']} "
-            + f"{request.headers['CSeq']['method']}\r\n"
-        )
-        response += f"Contact: {request.headers['Contact']}\r\n"
-        # TODO: Add Supported
-        response += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        response += 'Warning: 399 GS "Unable to accept call"\r\n'
-        response += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        response += "Content-Length: 0\r\n\r\n"
-
-        return response
+        fields = self._gen_response_fields(request, self.genTag())
+        fields["contact"] = request.headers["Contact"]
+        return self._busy_tmpl.format_map(fields)
 
     def genOk(self, request: SIPMessage) -> str:
         warnings.warn(
@@ -1304,25 +1522,8 @@ class SIPClient:
         return self.gen_ok(request)
 
     def gen_ok(self, request: SIPMessage) -> str:
-        okResponse = "SIP/2.0 200 OK\r\n"
-        okResponse += self._gen_response_via_header(request)
-        okResponse += (
-            f"From: {request.headers['From']['raw']};tag="
-            + f"{request.headers['From']['tag']}\r\n"
-        )
-        okResponse += (
-            f"To: {request.headers['To']['raw']};tag=" + f"{self.genTag()}\r\n"
-        )
-        okResponse += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        okResponse += (
-            f"CSeq: {request.headers['CSeq']['check']} "
-            + f"{request.headers['CSeq']['method']}\r\n"
-        )
-        okResponse += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        okResponse += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        okResponse += "Content-Length: 0\r\n\r\n"
-
-        return okResponse
+        fields = self._gen_response_fields(request, self.genTag())
+        return self._ok_tmpl.format_map(fields)
 
     def genRinging(self, request: SIPMessage) -> str:
         warnings.warn(
@@ -1335,27 +1536,11 @@ class SIPClient:
 
     def gen_ringing(self, request: SIPMessage) -> str:
         tag = self.genTag()
-        regRequest = "SIP/2.0 180 Ringing\r\n"
-        regRequest += self._gen_response_via_header(request)
-        regRequest += (
-            f"From: {request.headers['From']['raw']};tag="
-            + f"{request.headers['From']['tag']}\r\n"
-        )
-        regRequest += f"To: {request.headers['To']['raw']};tag={tag}\r\n"
-        regRequest += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        regRequest += (
-            f"CSeq: {request.headers['CSeq']['check']} "
-            + f"{request.headers['CSeq']['method']}\r\n"
-        )
-        regRequest += f"Contact: {request.headers['Contact']}\r\n"
-        # TODO: Add Supported
-        regRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        regRequest += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        regRequest += "Content-Length: 0\r\n\r\n"
-
+        fields = self._gen_response_fields(request, tag)
+        fields["contact"] = request.headers["Contact"]
         self.tagLibrary[request.headers["Call-ID"]] = tag
 
-        return regRequest
+        return self._ringing_tmpl.format_map(fields)
 
     def genAnswer(
         self,
@@ -1380,54 +1565,65 @@ class SIPClient:
         sendtype: "RTP.TransmitType",
     ) -> str:
         # Generate body first for content length
-        body = "v=0\r\n"
-        # TODO: Check IPv4/IPv6
-        body += f"o=pyVoIP {sess_id} {int(sess_id)+2} IN IP4 {self.myIP}\r\n"
-        body += f"s=pyVoIP {pyVoIP.__version__}\r\n"
-        # TODO: Check IPv4/IPv6
-        body += f"c=IN IP4 {self.myIP}\r\n"
-        body += "t=0 0\r\n"
-        for x in ms:
-            # TODO: Check AVP mode from request
-            body += f"m=audio {x} RTP/AVP"
-            for m in ms[x]:
-                body += f" {m}"
-        body += "\r\n"  # m=audio <port> RTP/AVP <codecs>\r\n
-        for x in ms:
-            for m in ms[x]:
-                body += f"a=rtpmap:{m} {ms[x][m]}/{ms[x][m].rate}\r\n"
-                if str(ms[x][m]) == "telephone-event":
-                    body += f"a=fmtp:{m} 0-15\r\n"
-        body += "a=ptime:20\r\n"
-        body += "a=maxptime:150\r\n"
-        body += f"a={sendtype}\r\n"
-
-        tag = self.tagLibrary[request.headers["Call-ID"]]
-
-        regRequest = "SIP/2.0 200 OK\r\n"
-        regRequest += self._gen_response_via_header(request)
-        regRequest += (
-            f"From: {request.headers['From']['raw']};tag="
-            + f"{request.headers['From']['tag']}\r\n"
-        )
-        regRequest += f"To: {request.headers['To']['raw']};tag={tag}\r\n"
-        regRequest += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        regRequest += (
-            f"CSeq: {request.headers['CSeq']['check']} "
-            + f"{request.headers['CSeq']['method']}\r\n"
-        )
-        regRequest += (
-            "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort}>\r\n"
+        body = self._gen_sdp(sess_id, ms, sendtype)
+
+        headers = request.headers
+        from_hdr = headers["From"]
+        cseq_hdr = headers["CSeq"]
+        call_id = headers["Call-ID"]
+        tag = self.tagLibrary[call_id]
+
+        regRequest = ["SIP/2.0 200 OK\r\n"]
+        regRequest.append(self._gen_response_via_header(request))
+        regRequest.append(f"From: {from_hdr['raw']};tag={from_hdr['tag']}\r\n")
+        regRequest.append(f"To: {headers['To']['raw']};tag={tag}\r\n")
+        regRequest.append(f"Call-ID: {call_id}\r\n")
+        regRequest.append(
+            f"CSeq: {cseq_hdr['check']} {cseq_hdr['method']}\r\n"
         )
+        regRequest.append(self._contact_hdr)
         # TODO: Add Supported
-        regRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        regRequest += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        regRequest += "Content-Type: application/sdp\r\n"
-        regRequest += f"Content-Length: {len(body)}\r\n\r\n"
-        regRequest += body
+        regRequest.append(self._ua_hdr)
+        regRequest.append(self._allow_hdr)
+        regRequest.append("Content-Type: application/sdp\r\n")
+        regRequest.append(f"Content-Length: {len(body)}\r\n\r\n")
+        regRequest.append(body)
+
+        return "".join(regRequest)
 
-        return regRequest
+    def _gen_sdp(
+        self,
+        sess_id: str,
+        ms: Dict[int, Dict[Any, "RTP.PayloadType"]],
+        sendtype: "RTP.TransmitType",
+    ) -> str:
+        sdp = ["v=0\r\n"]
+        # TODO: Check IPv4/IPv6
+        sdp.append(
+            f"o=pyVoIP {sess_id} {int(sess_id)+2} IN IP4 {self.myIP}\r\n"
+        )
+        sdp.append(f"s=pyVoIP {pyVoIP.__version__}\r\n")
+        sdp.append(f"c=IN IP4 {self.myIP}\r\n")  # TODO: Check IPv4/IPv6
+        sdp.append("t=0 0\r\n")
+        # The m= and a= lines are collected in a single pass over ms.
+        attributes: List[str] = []
+        for x, codecs in ms.items():
+            # TODO: Check AVP mode from request
+            sdp.append(f"m=audio {x} RTP/AVP")
+            for m, payload_type in codecs.items():
+                sdp.append(f" {m}")
+                encoding = str(payload_type)
+                attributes.append(
+                    f"a=rtpmap:{m} {encoding}/{payload_type.rate}\r\n"
+                )
+                if encoding == "telephone-event":
+                    attributes.append(f"a=fmtp:{m} 0-15\r\n")
+        sdp.append("\r\n")  # m=audio <port> RTP/AVP <codecs>\r\n
+        sdp.extend(attributes)
+        sdp.append("a=ptime:20\r\n")
+        sdp.append("a=maxptime:150\r\n")
+        sdp.append(f"a={sendtype}\r\n")
+        return "".join(sdp)
 
     def genInvite(
         self,
@@ -1437,6 +1633,7 @@ class SIPClient:
         sendtype: "RTP.TransmitType",
         branch: str,
         call_id: str,
+        auth: str = "",
     ) -> str:
         warnings.warn(
             "genInvite is deprecated due to PEP8 compliance. "
@@ -1444,7 +1641,9 @@ class SIPClient:
             DeprecationWarning,
             stacklevel=2,
         )
-        return self.gen_invite(number, sess_id, ms, sendtype, branch, call_id)
+        return self.gen_invite(
+            number, sess_id, ms, sendtype, branch, call_id, auth
+        )
 
     def gen_invite(
         self,
@@ -1454,53 +1653,35 @@ class SIPClient:
         sendtype: "RTP.TransmitType",
         branch: str,
         call_id: str,
+        auth: str = "",
     ) -> str:
-        # Generate body first for content length
-        body = "v=0\r\n"
-        # TODO: Check IPv4/IPv6
-        body += f"o=pyVoIP {sess_id} {int(sess_id)+2} IN IP4 {self.myIP}\r\n"
-        body += f"s=pyVoIP {pyVoIP.__version__}\r\n"
-        body += f"c=IN IP4 {self.myIP}\r\n"  # TODO: Check IPv4/IPv6
-        body += "t=0 0\r\n"
-        for x in ms:
-            # TODO: Check AVP mode from request
-            body += f"m=audio {x} RTP/AVP"
-            for m in ms[x]:
-                body += f" {m}"
-        body += "\r\n"  # m=audio <port> RTP/AVP <codecs>\r\n
-        for x in ms:
-            for m in ms[x]:
-                body += f"a=rtpmap:{m} {ms[x][m]}/{ms[x][m].rate}\r\n"
-                if str(ms[x][m]) == "telephone-event":
-                    body += f"a=fmtp:{m} 0-15\r\n"
-        body += "a=ptime:20\r\n"
-        body += "a=maxptime:150\r\n"
-        body += f"a={sendtype}\r\n"
+        body = self._gen_sdp(sess_id, ms, sendtype)
+        return self._gen_invite(number, body, branch, call_id, auth)
 
+    def _gen_invite(
+        self, number: str, body: str, branch: str, call_id: str, auth: str
+    ) -> str:
         tag = self.genTag()
         self.tagLibrary[call_id] = tag
 
-        invRequest = f"INVITE sip:{number}@{self.server} SIP/2.0\r\n"
-        invRequest += (
-            f"Via: SIP/2.0/UDP {self.myIP}:{self.myPort};branch="
-            + f"{branch}\r\n"
-        )
-        invRequest += "Max-Forwards: 70\r\n"
-        invRequest += (
-            "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort}>\r\n"
+        invRequest = [f"INVITE sip:{number}@{self.server} SIP/2.0\r\n"]
+        invRequest.append(
+            f"Via: SIP/2.0/UDP {self._bind_addr};branch={branch}\r\n"
         )
-        invRequest += f"To: <sip:{number}@{self.server}>\r\n"
-        invRequest += f"From: <sip:{self.username}@{self.myIP}>;tag={tag}\r\n"
-        invRequest += f"Call-ID: {call_id}\r\n"
-        invRequest += f"CSeq: {self.inviteCounter.next()} INVITE\r\n"
-        invRequest += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        invRequest += "Content-Type: application/sdp\r\n"
-        invRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        invRequest += f"Content-Length: {len(body)}\r\n\r\n"
-        invRequest += body
-
-        return invRequest
+        invRequest.append("Max-Forwards: 70\r\n")
+        invRequest.append(self._contact_hdr)
+        invRequest.append(f"To: <sip:{number}@{self.server}>\r\n")
+        invRequest.append(f"{self._invite_from_prefix}{tag}\r\n")
+        invRequest.append(f"Call-ID: {call_id}\r\n")
+        invRequest.append(f"CSeq: {self.inviteCounter.next()} INVITE\r\n")
+        invRequest.append(self._allow_hdr)
+        invRequest.append("Content-Type: application/sdp\r\n")
+        invRequest.append(self._ua_hdr)
+        invRequest.append(auth)
+        invRequest.append(f"Content-Length: {len(body)}\r\n\r\n")
+        invRequest.append(body)
+
+        return "".join(invRequest)
 
     def genBye(self, request: SIPMessage) -> str:
         warnings.warn(
@@ -1512,36 +1693,35 @@ class SIPClient:
         return self.gen_bye(request)
 
     def gen_bye(self, request: SIPMessage) -> str:
-        tag = self.tagLibrary[request.headers["Call-ID"]]
-        c = request.headers["Contact"].strip("<").strip(">")
-        byeRequest = f"BYE {c} SIP/2.0\r\n"
-        byeRequest += self._gen_response_via_header(request)
-        fromH = request.headers["From"]["raw"]
-        toH = request.headers["To"]["raw"]
-        if request.headers["From"]["tag"] == tag:
-            byeRequest += f"From: {fromH};tag={tag}\r\n"
-            if request.headers["To"]["tag"] != "":
-                to = toH + ";tag=" + request.headers["To"]["tag"]
+        headers = request.headers
+        from_hdr = headers["From"]
+        to_hdr = headers["To"]
+        call_id = headers["Call-ID"]
+        tag = self.tagLibrary[call_id]
+        c = headers["Contact"].strip("<").strip(">")
+        byeRequest = [f"BYE {c} SIP/2.0\r\n"]
+        byeRequest.append(self._gen_response_via_header(request))
+        fromH = from_hdr["raw"]
+        toH = to_hdr["raw"]
+        if from_hdr["tag"] == tag:
+            byeRequest.append(f"From: {fromH};tag={tag}\r\n")
+            if to_hdr["tag"] != "":
+                to = toH + ";tag=" + to_hdr["tag"]
             else:
                 to = toH
-            byeRequest += f"To: {to}\r\n"
+            byeRequest.append(f"To: {to}\r\n")
         else:
-            byeRequest += (
-                f"To: {fromH};tag=" + f"{request.headers['From']['tag']}\r\n"
-            )
-            byeRequest += f"From: {toH};tag={tag}\r\n"
-        byeRequest += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        cseq = int(request.headers["CSeq"]["check"]) + 1
-        byeRequest += f"CSeq: {cseq} BYE\r\n"
-        byeRequest += (
-            "Contact: "
-            + f"<sip:{self.username}@{self.myIP}:{self.myPort}>\r\n"
-        )
-        byeRequest += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        byeRequest += f"Allow: {(', '.join(pyVoIP.SIPCompatibleMethods))}\r\n"
-        byeRequest += "Content-Length: 0\r\n\r\n"
-
-        return byeRequest
+            byeRequest.append(f"To: {fromH};tag={from_hdr['tag']}\r\n")
+            byeRequest.append(f"From: {toH};tag={tag}\r\n")
+        byeRequest.append(f"Call-ID: {call_id}\r\n")
+        cseq = int(headers["CSeq"]["check"]) + 1
+        byeRequest.append(f"CSeq: {cseq} BYE\r\n")
+        byeRequest.append(self._contact_hdr)
+        byeRequest.append(self._ua_hdr)
+        byeRequest.append(self._allow_hdr)
+        byeRequest.append("Content-Length: 0\r\n\r\n")
+
+        return "".join(byeRequest)
 
     def genAck(self, request: SIPMessage) -> str:
         warnings.warn(
@@ -1553,41 +1733,57 @@ class SIPClient:
         return self.gen_ack(request)
 
     def gen_ack(self, request: SIPMessage) -> str:
-        tag = self.tagLibrary[request.headers["Call-ID"]]
-        t = request.headers["To"]["raw"].strip("<").strip(">")
-        ackMessage = f"ACK {t} SIP/2.0\r\n"
-        ackMessage += self._gen_response_via_header(request)
-        ackMessage += "Max-Forwards: 70\r\n"
-        ackMessage += (
-            f"To: {request.headers['To']['raw']};tag=" + f"{self.genTag()}\r\n"
-        )
-        ackMessage += f"From: {request.headers['From']['raw']};tag={tag}\r\n"
-        ackMessage += f"Call-ID: {request.headers['Call-ID']}\r\n"
-        ackMessage += f"CSeq: {request.headers['CSeq']['check']} ACK\r\n"
-        ackMessage += f"User-Agent: pyVoIP {pyVoIP.__version__}\r\n"
-        ackMessage += "Content-Length: 0\r\n\r\n"
-
-        return ackMessage
+        headers = request.headers
+        to_raw = headers["To"]["raw"]
+        call_id = headers["Call-ID"]
+        tag = self.tagLibrary[call_id]
+        t = to_raw.strip("<").strip(">")
+        ackMessage = [f"ACK {t} SIP/2.0\r\n"]
+        ackMessage.append(self._gen_response_via_header(request))
+        ackMessage.append("Max-Forwards: 70\r\n")
+        ackMessage.append(f"To: {to_raw};tag={self.genTag()}\r\n")
+        ackMessage.append(f"From: {headers['From']['raw']};tag={tag}\r\n")
+        ackMessage.append(f"Call-ID: {call_id}\r\n")
+        ackMessage.append(f"CSeq: {headers['CSeq']['check']} ACK\r\n")
+        ackMessage.append(self._ua_hdr)
+        ackMessage.append("Content-Length: 0\r\n\r\n")
+
+        return "".join(ackMessage)
+
+    def _gen_response_fields(
+        self, request: SIPMessage, tag: str
+    ) -> Dict[str, Any]:
+        """
+        Collect the values the response templates copy from the request.
+        """
+        headers = request.headers
+        from_hdr = headers["From"]
+        cseq_hdr = headers["CSeq"]
+        return {
+            "via": self._gen_response_via_header(request),
+            "from_raw": from_hdr["raw"],
+            "from_tag": from_hdr["tag"],
+            "to_raw": headers["To"]["raw"],
+            "to_tag": tag,
+            "call_id": headers["Call-ID"],
+            "cseq": cseq_hdr["check"],
+            "method": cseq_hdr["method"],
+        }
 
     def _gen_response_via_header(self, request: SIPMessage) -> str:
-        via = ""
+        via = []
         for h_via in request.headers["Via"]:
-            v_line = (
-                "Via: SIP/2.0/UDP "
-                + f'{h_via["address"][0]}:{h_via["address"][1]}'
-            )
-            if "branch" in h_via.keys():
-                v_line += f';branch={h_via["branch"]}'
-            if "rport" in h_via.keys():
-                if h_via["rport"] is not None:
-                    v_line += f';rport={h_via["rport"]}'
-                else:
-                    v_line += ";rport"
-            if "received" in h_via.keys():
-                v_line += f';received={h_via["received"]}'
-            v_line += "\r\n"
-            via += v_line
-        return via
+            address = h_via["address"]
+            via.append(f"Via: SIP/2.0/UDP {address[0]}:{address[1]}")
+            if "branch" in h_via:
+                via.append(f';branch={h_via["branch"]}')
+            if "rport" in h_via:
+                rport = h_via["rport"]
+                via.append(";rport" if rport is None else f";rport={rport}")
+            if "received" in h_via:
+                via.append(f';received={h_via["received"]}')
+            via.append("\r\n")
+        return "".join(via)
 
     def invite(
         self,
@@ -1595,90 +1791,92 @@ class SIPClient:
         ms: Dict[int, Dict[str, "RTP.PayloadType"]],
         sendtype: "RTP.TransmitType",
     ) -> Tuple[SIPMessage, str, int]:
-        branch = "z9hG4bK" + self.genCallID()[0:25]
+        branch = self.gen_branch()
         call_id = self.genCallID()
         sess_id = self.sessID.next()
-        invite = self.genInvite(
-            number, str(sess_id), ms, sendtype, branch, call_id
-        )
-        self.recvLock.acquire()
-        self.out.sendto(invite.encode("utf8"), (self.server, self.port))
-        debug("Invited")
-        response = SIPMessage(self.s.recv(8192))
-
-        while (
-            response.status != SIPStatus(401)
-            and response.status != SIPStatus(100)
-            and response.status != SIPStatus(180)
-        ) or response.headers["Call-ID"] != call_id:
-            if not self.NSD:
-                break
-            self.parseMessage(response)
-            response = SIPMessage(self.s.recv(8192))
-
-        if response.status == SIPStatus(100) or response.status == SIPStatus(
-            180
-        ):
-            return SIPMessage(invite.encode("utf8")), call_id, sess_id
-        debug(f"Received Response: {response.summary()}")
-        ack = self.genAck(response)
-        self.out.sendto(ack.encode("utf8"), (self.server, self.port))
-        debug("Acknowledged")
-        authhash = self.genAuthorization(response)
-        nonce = response.authentication["nonce"]
-        realm = response.authentication["realm"]
-        auth = (
-            f'Authorization: Digest username="{self.username}",realm='
-            + f'"{realm}",nonce="{nonce}",uri="sip:{self.server};'
-            + f'transport=UDP",response="{str(authhash, "utf8")}",'
-            + "algorithm=MD5\r\n"
-        )
-
-        invite = self.genInvite(
-            number, str(sess_id), ms, sendtype, branch, call_id
-        )
-        invite = invite.replace(
-            "\r\nContent-Length", f"\r\n{auth}Content-Length"
+        # The SDP body is the same for the authenticated retry. Each INVITE
+        # is encoded once, the same bytes are sent and parsed for the caller.
+        body = self._gen_sdp(str(sess_id), ms, sendtype)
+        invite = self._gen_invite(number, body, branch, call_id, "").encode(
+            "utf8"
         )
+        with self.recvLock:
+            self._send(invite)
+            debug("Invited")
+            response = self._recv_sip(call_id, self.register_timeout)
+
+            while (
+                response is not None
+                and response.status not in _INVITE_RESPONSE_STATUSES
+            ):
+                if not self.NSD:
+                    break
+                self.parseMessage(response)
+                response = self._recv_sip(call_id, self.register_timeout)
+
+            if response is None:
+                raise TimeoutError(f"Inviting {number} timed out")
+
+            if response.status in _PROVISIONAL_STATUSES:
+                return SIPMessage(invite), call_id, sess_id
+            debug(f"Received Response: {response.summary()}")
+            ack = self.genAck(response)
+            authhash = self.genAuthorization(response)
+            nonce = response.authentication["nonce"]
+            realm = response.authentication["realm"]
+            auth = (
+                f'Authorization: Digest username="{self.username}",realm='
+                + f'"{realm}",nonce="{nonce}",uri="sip:{self.server};'
+                + f'transport=UDP",{authhash},algorithm=MD5\r\n'
+            )
 
-        self.out.sendto(invite.encode("utf8"), (self.server, self.port))
+            invite = self._gen_invite(
+                number, body, branch, call_id, auth
+            ).encode("utf8")
 
-        self.recvLock.release()
+            self._send_batch([ack, invite])
+            debug("Acknowledged and re-invited")
 
-        return SIPMessage(invite.encode("utf8")), call_id, sess_id
+            return SIPMessage(invite), call_id, sess_id
 
     def bye(self, request: SIPMessage) -> None:
         message = self.genBye(request)
         # TODO: Handle bye to server vs. bye to connected client
-        self.out.sendto(message.encode("utf8"), (self.server, self.port))
+        self._send(message)
 
     def deregister(self) -> bool:
-        self.recvLock.acquire()
-        firstRequest = self.genFirstRequest(deregister=True)
-        self.out.sendto(firstRequest.encode("utf8"), (self.server, self.port))
+        for attempt in range(_REGISTER_ATTEMPTS):
+            if attempt:
+                time.sleep(self._register_backoff(attempt))
+            result = self._deregister()
+            if result is not None:
+                return result
+        return False
 
-        self.out.setblocking(False)
+    def _deregister(self) -> Optional[bool]:
+        """
+        Sends one DE-REGISTER.  Returns None if the server answered with
+        500 Server Internal Error.
+        """
+        with self.recvLock:
+            call_id = self.gen_call_id()
+            firstRequest = self._gen_first_request(call_id, deregister=True)
+            self._send(firstRequest)
 
-        ready = select.select([self.out], [], [], self.register_timeout)
-        if ready[0]:
-            resp = self.s.recv(8192)
-        else:
-            raise TimeoutError("Deregistering on SIP Server timed out")
+            response = self._recv_sip(call_id, self.register_timeout)
+            if response is None:
+                raise TimeoutError("Deregistering on SIP Server timed out")
 
-        response = SIPMessage(resp)
-        response = self.trying_timeout_check(response)
+            response = self.trying_timeout_check(response)
 
-        if response.status == SIPStatus(401):
-            # Unauthorized, likely due to being password protected.
-            regRequest = self.genRegister(response, deregister=True)
-            self.out.sendto(
-                regRequest.encode("utf8"), (self.server, self.port)
-            )
-            ready = select.select([self.s], [], [], self.register_timeout)
-            if ready[0]:
-                resp = self.s.recv(8192)
-                response = SIPMessage(resp)
-                if response.status == SIPStatus(401):
+            if response.status == SIPStatus.UNAUTHORIZED:
+                # Unauthorized, likely due to being password protected.
+                regRequest = self.genRegister(response, deregister=True)
+                self._send(regRequest)
+                response = self._recv_sip(call_id, self.register_timeout)
+                if response is None:
+                    raise TimeoutError("Deregistering on SIP Server timed out")
+                if response.status == SIPStatus.UNAUTHORIZED:
                     # At this point, it's reasonable to assume that
                     # this is caused by invalid credentials.
                     debug("Unauthorized")
@@ -1688,80 +1886,92 @@ class SIPClient:
                         + f"{self.server}:"
                         + f"{self.myPort}"
                     )
-                elif response.status == SIPStatus(400):
+                elif response.status == SIPStatus.BAD_REQUEST:
                     # Bad Request
                     # TODO: implement
                     # TODO: check if broken connection can be brought back
                     # with new urn:uuid or reply with expire 0
                     self._handle_bad_request()
-            else:
-                raise TimeoutError("Deregistering on SIP Server timed out")
 
-        if response.status == SIPStatus(500):
-            self.recvLock.release()
-            time.sleep(5)
-            return self.deregister()
+            if response.status == SIPStatus.INTERNAL_SERVER_ERROR:
+                return None
 
-        if response.status == SIPStatus.OK:
-            self.recvLock.release()
-            return True
-        self.recvLock.release()
-        return False
+            if response.status == SIPStatus.OK:
+                return True
+            return False
 
     def register(self) -> bool:
-        self.recvLock.acquire()
-        firstRequest = self.genFirstRequest()
-        self.out.sendto(firstRequest.encode("utf8"), (self.server, self.port))
+        for attempt in range(_REGISTER_ATTEMPTS):
+            # stop() cuts the wait short instead of waiting out the backoff.
+            if attempt and self._stop_event.wait(
+                self._register_backoff(attempt)
+            ):
+                return False
+            result = self._register()
+            if result is not None:
+                return result
+        raise InvalidAccountInfoError(
+            f"SIP server {self.server}:{self.port} answered "
+            + f"{_REGISTER_ATTEMPTS} REGISTER attempts with "
+            + "500 Server Internal Error"
+        )
 
-        self.out.setblocking(False)
+    def _register(self) -> Optional[bool]:
+        """
+        Sends one REGISTER.  Returns None if the server answered with
+        500 Server Internal Error.
+        """
+        with self.recvLock:
+            challenge = self._register_challenge
+            if challenge is not None:
+                # Answer the last challenge right away. The server only
+                # challenges again if it no longer accepts the nonce.
+                call_id = challenge.headers["Call-ID"]
+                self._send(self.gen_register(challenge))
+            else:
+                call_id = self.gen_call_id()
+                firstRequest = self._gen_first_request(call_id)
+                self._send(firstRequest)
 
-        ready = select.select([self.out], [], [], self.register_timeout)
-        if ready[0]:
-            resp = self.s.recv(8192)
-        else:
-            raise TimeoutError("Registering on SIP Server timed out")
-
-        response = SIPMessage(resp)
-        response = self.trying_timeout_check(response)
-        first_response = response
-
-        if response.status == SIPStatus(400):
-            # Bad Request
-            # TODO: implement
-            # TODO: check if broken connection can be brought back
-            # with new urn:uuid or reply with expire 0
-            self._handle_bad_request()
-
-        if response.status == SIPStatus(401):
-            # Unauthorized, likely due to being password protected.
-            regRequest = self.gen_register(response)
-            self.out.sendto(
-                regRequest.encode("utf8"), (self.server, self.port)
-            )
-            ready = select.select([self.s], [], [], self.register_timeout)
-            if ready[0]:
-                resp = self.s.recv(8192)
-                response = SIPMessage(resp)
+            response = self._recv_sip(call_id, self.register_timeout)
+            if response is None:
+                raise TimeoutError("Registering on SIP Server timed out")
+
+            response = self.trying_timeout_check(response)
+            first_response = response
+
+            if response.status == SIPStatus.BAD_REQUEST:
+                # Bad Request
+                # TODO: implement
+                # TODO: check if broken connection can be brought back
+                # with new urn:uuid or reply with expire 0
+                self._handle_bad_request()
+
+            if response.status == SIPStatus.UNAUTHORIZED:
+                # Unauthorized, likely due to being password protected.
+                self._register_challenge = response
+                regRequest = self.gen_register(response)
+                self._send(regRequest)
+                response = self._recv_sip(call_id, self.register_timeout)
+                if response is None:
+                    raise TimeoutError("Registering on SIP Server timed out")
                 response = self.trying_timeout_check(response)
-                if response.status == SIPStatus(401):
+                if response.status == SIPStatus.UNAUTHORIZED:
                     # At this point, it's reasonable to assume that
                     # this is caused by invalid credentials.
                     print("Seemingly invalid credentials")
                     print(response.authentication)
                     if response.authentication.get("stale") == "true" or response.authentication.get("stale") == "true,":
                         print("Stale is TRUE")
+                        self._register_challenge = response
                         reg_request = self.gen_register(response)
-                        self.out.sendto(
-                            reg_request.encode("utf8"),
-                            (self.server, self.port),
-                        )
-                        ready = select.select(
-                            [self.s], [], [], self.register_timeout
+                        self._send(reg_request)
+                        stale_response = self._recv_sip(
+                            call_id, self.register_timeout
                         )
-                        if ready[0]:
-                            resp = self.s.recv(8192)
-                            response = SIPMessage(resp)
-                            if response.status == SIPStatus(401):
+                        if stale_response is not None:
+                            response = stale_response
+                            if response.status == SIPStatus.UNAUTHORIZED:
                                 print("Still didn't work")
                                 raise InvalidAccountInfoError(
                                     "Invalid Username or "
@@ -1779,57 +1989,64 @@ class SIPClient:
                             + f"{self.server}:"
                             + f"{self.myPort}"
                         )
-                elif response.status == SIPStatus(400):
+                elif response.status == SIPStatus.BAD_REQUEST:
                     # Bad Request
                     # TODO: implement
                     # TODO: check if broken connection can be brought back
                     # with new urn:uuid or reply with expire 0
                     self._handle_bad_request()
-            else:
-                raise TimeoutError("Registering on SIP Server timed out")
 
-        if response.status == SIPStatus(407):
-            # Proxy Authentication Required
-            # TODO: implement
-            debug("Proxy auth required")
-
-        # TODO: This must be done more reliable
-        if response.status not in [
-            SIPStatus(400),
-            SIPStatus(401),
-            SIPStatus(407),
-        ]:
-            # Unauthorized
-            if response.status == SIPStatus(500):
-                self.recvLock.release()
-                time.sleep(5)
-                return self.register()
-            else:
-                # TODO: determine if needed here
-                self.parseMessage(response)
+            if response.status == SIPStatus.PROXY_AUTHENTICATION_REQUIRED:
+                # Proxy Authentication Required
+                # TODO: implement
+                debug("Proxy auth required")
+
+            # TODO: This must be done more reliable
+            if response.status not in [
+                SIPStatus.BAD_REQUEST,
+                SIPStatus.UNAUTHORIZED,
+                SIPStatus.PROXY_AUTHENTICATION_REQUIRED,
+            ]:
+                # Unauthorized
+                if response.status == SIPStatus.INTERNAL_SERVER_ERROR:
+                    return None
+                else:
+                    # TODO: determine if needed here
+                    self.parseMessage(response)
 
-        debug(response.summary())
-        debug(response.raw)
+            debug(response.summary())
+            debug(response.raw)
 
-        self.recvLock.release()
-        if response.status == SIPStatus.OK:
-            print(response.status)
-            if self.NSD:
+            if response.status == SIPStatus.OK:
+                print(response.status)
                 # self.subscribe(response)
-                self.registerThread = Timer(
-                    self.default_expires - 5, self.register
-                )
-                self.registerThread.name = (
-                    "SIP Register CSeq: " + f"{self.registerCounter.x}"
+                return True
+            else:
+                raise InvalidAccountInfoError(
+                    "Invalid Username or Password for "
+                    + f"SIP server {self.server}:"
+                    + f"{self.myPort}"
                 )
-                self.registerThread.start()
-            return True
-        else:
-            raise InvalidAccountInfoError(
-                "Invalid Username or Password for "
-                + f"SIP server {self.server}:"
-                + f"{self.myPort}"
-            )
+
+    def _register_backoff(self, attempt: int) -> float:
+        """
+        Seconds to wait before retrying a REGISTER, doubling from five
+        seconds up to _REGISTER_MAX_BACKOFF.
+        """
+        return min(_REGISTER_MAX_BACKOFF, 5 * 2 ** (attempt - 1))
+
+    def _register_loop(self) -> None:
+        """
+        Refreshes the registration shortly before it expires until stop()
+        is called.
+        """
+        while not self._stop_event.wait(self.default_expires - 5):
+            # Keep refreshing through outages, only the first register()
+            # in start() reports errors to the caller.
+            try:
+                self.register()
+            except (InvalidAccountInfoError, TimeoutError) as e:
+                debug(f"SIP register refresh failed: {e}")
 
     def _handle_bad_request(self) -> None:
         # Bad Request
@@ -1840,16 +2057,19 @@ class SIPClient:
 
     def subscribe(self, lastresponse: SIPMessage) -> None:
         # TODO: check if needed and maybe implement fully
-        self.recvLock.acquire()
+        with self.recvLock:
+            subRequest = self.genSubscribe(lastresponse)
+            self._send(subRequest)
 
-        subRequest = self.genSubscribe(lastresponse)
-        self.out.sendto(subRequest.encode("utf8"), (self.server, self.port))
-
-        response = SIPMessage(self.s.recv(8192))
-
-        debug(f'Got response to subscribe: {str(response.heading, "utf8")}')
+            response = self._recv_sip(
+                lastresponse.headers["Call-ID"], self.register_timeout
+            )
 
-        self.recvLock.release()
+            if response is not None:
+                debug(
+                    "Got response to subscribe: "
+                    + f'{str(response.heading, "utf8")}'
+                )
 
     def trying_timeout_check(self, response: SIPMessage) -> SIPMessage:
         """
@@ -1858,16 +2078,15 @@ class SIPClient:
         SIPStatus.TRYING. This while loop tries checks every second for an
         updated response. It times out after 30 seconds.
         """
-        start_time = time.monotonic()
+        call_id = response.headers["Call-ID"]
+        deadline = time.monotonic() + self.register_timeout
         while response.status == SIPStatus.TRYING:
-            if (time.monotonic() - start_time) >= self.register_timeout:
+            remaining = deadline - time.monotonic()
+            next_response = self._recv_sip(call_id, remaining)
+            if next_response is None:
                 raise TimeoutError(
                     f"Waited {self.register_timeout} seconds but server is "
                     + "still TRYING"
                 )
-
-            ready = select.select([self.s], [], [], self.register_timeout)
-            if ready[0]:
-                resp = self.s.recv(8192)
-            response = SIPMessage(resp)
+            response = next_response
         return response
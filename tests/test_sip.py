@@ -1,5 +1,14 @@
-from pyVoIP.SIP import SIPMessage
+from pyVoIP.SIP import (
+    _REGISTER_ATTEMPTS,
+    InvalidAccountInfoError,
+    SIPClient,
+    SIPMessage,
+)
+import hashlib
 import pytest
+import re
+import socket
+import threading
 
 
 @pytest.mark.parametrize(
@@ -40,3 +49,215 @@ import pytest
 def test_sip_authentication(packet, expected):
     message = SIPMessage(packet)
     assert message.authentication == expected
+
+
+def test_register_template_escapes_braces():
+    client = SIPClient("srv{0}", 5060, "us{er}", "pw", myIP="127.0.0.1")
+    request = client.gen_first_response()
+    assert request.startswith("REGISTER sip:srv{0} SIP/2.0\r\n")
+    assert 'From: "us{er}" <sip:us{er}@srv{0}>;tag=' in request
+    assert request.endswith("Expires: 120\r\nContent-Length: 0\r\n\r\n")
+
+
+def _challenge(nonce, qop=False):
+    qop = ',qop="auth"' if qop else ""
+    return SIPMessage(
+        (
+            "SIP/2.0 401 Unauthorized\r\n"
+            "Via: SIP/2.0/UDP 127.0.0.1:5060;branch=z9hG4bKabc;rport\r\n"
+            'From: "u" <sip:u@srv>;tag=a\r\n'
+            'To: "u" <sip:u@srv>;tag=b\r\n'
+            "Call-ID: 1@127.0.0.1:5060\r\n"
+            "CSeq: 1 REGISTER\r\n"
+            f'WWW-Authenticate: Digest realm="r",nonce="{nonce}"{qop}\r\n'
+            "Content-Length: 0\r\n\r\n"
+        ).encode()
+    )
+
+
+def test_authorization_caches_ha1_per_credentials():
+    challenge = _challenge("n")
+
+    def expected(password):
+        ha1 = hashlib.md5(f"u:r:{password}".encode()).hexdigest()
+        ha2 = hashlib.md5(b"REGISTER:sip:srv;transport=UDP").hexdigest()
+        response = hashlib.md5(f"{ha1}:n:{ha2}".encode()).hexdigest()
+        return f'response="{response}"'
+
+    client = SIPClient("srv", 5060, "u", "pw", myIP="127.0.0.1")
+    assert client.gen_authorization(challenge) == expected("pw")
+    assert client.gen_authorization(challenge) == expected("pw")
+    assert len(client._ha1_cache) == 1
+    client.password = "new"
+    assert client.gen_authorization(challenge) == expected("new")
+
+
+def test_authorization_counts_per_nonce():
+    client = SIPClient("srv", 5060, "u", "pw", myIP="127.0.0.1")
+    a = _challenge("a", qop=True)
+    b = _challenge("b", qop=True)
+    assert 'nc="00000001"' in client.gen_authorization(a)
+    assert 'nc="00000002"' in client.gen_authorization(a)
+    assert 'nc="00000001"' in client.gen_authorization(b)
+    assert 'nc="00000003"' in client.gen_authorization(a)
+
+
+def test_sdp_encryption_key_without_value():
+    body = (
+        b"v=0\r\n"
+        b"o=- 1 1 IN IP4 127.0.0.1\r\n"
+        b"s=-\r\n"
+        b"c=IN IP4 127.0.0.1\r\n"
+        b"t=0 0\r\n"
+        b"k=prompt\r\n"
+    )
+    message = SIPMessage(
+        b"INVITE sip:u@127.0.0.1 SIP/2.0\r\n"
+        b"Via: SIP/2.0/UDP 127.0.0.1:5060;branch=z9hG4bKabc\r\n"
+        b"From: <sip:a@127.0.0.1>;tag=a\r\n"
+        b"To: <sip:u@127.0.0.1>\r\n"
+        b"Call-ID: 1@127.0.0.1\r\n"
+        b"CSeq: 1 INVITE\r\n"
+        b"Content-Type: application/sdp\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+    )
+    assert message.body["k"] == {"method": "prompt"}
+
+
+def test_body_with_trailing_blank_line():
+    message = SIPMessage(
+        b"SIP/2.0 200 OK\r\n"
+        b"Via: SIP/2.0/UDP 127.0.0.1:5060;branch=z9hG4bKabc\r\n"
+        b"From: <sip:a@127.0.0.1>;tag=a\r\n"
+        b"To: <sip:u@127.0.0.1>;tag=b\r\n"
+        b"Call-ID: 1@127.0.0.1\r\n"
+        b"CSeq: 1 INVITE\r\n"
+        b"Content-Type: application/sdp\r\n"
+        b"Content-Length: 9\r\n\r\n"
+        b"v=0\r\n\r\n\r\n"
+    )
+    assert message.headers["Call-ID"] == "1@127.0.0.1"
+    assert message.body["v"] == 0
+
+
+class _Registrar:
+    """
+    Answers REGISTER requests on 127.0.0.1. respond(request) returns the
+    status line and extra headers of the reply.
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        self.s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.s.bind(("127.0.0.1", 0))
+        self.port = self.s.getsockname()[1]
+        threading.Thread(target=self.serve, daemon=True).start()
+
+    def serve(self):
+        while True:
+            try:
+                data, addr = self.s.recvfrom(65535)
+            except OSError:
+                return
+            request = data.decode("utf8")
+            self.requests.append(request)
+            status, extra = self.respond(request)
+            headers = "".join(
+                f"{name}: {_header(request, name)}\r\n"
+                for name in ("Via", "From", "To", "Call-ID", "CSeq")
+            )
+            self.s.sendto(
+                (
+                    f"SIP/2.0 {status}\r\n{headers}{extra}"
+                    + "Content-Length: 0\r\n\r\n"
+                ).encode("utf8"),
+                addr,
+            )
+
+    def close(self):
+        self.s.close()
+
+
+def _header(request, name):
+    return re.search(rf"^{name}: (.*)\r$", request, re.M).group(1)
+
+
+def _nonce(request):
+    match = re.search(r'^Authorization: .*nonce="([^"]*)"', request, re.M)
+    return match.group(1) if match else None
+
+
+def _unauthorized(nonce, stale=False):
+    stale_param = ",stale=true" if stale else ""
+    return (
+        "401 Unauthorized",
+        f'WWW-Authenticate: Digest realm="r",nonce="{nonce}"{stale_param}'
+        + "\r\n",
+    )
+
+
+def _start_client(registrar):
+    client = SIPClient(
+        "127.0.0.1", registrar.port, "u", "p", myIP="127.0.0.1", myPort=0
+    )
+    client.register_timeout = 5
+    client._register_backoff = lambda attempt: 0
+    return client
+
+
+def test_register_refresh_answers_cached_challenge():
+    def respond(request):
+        if _nonce(request) == "n1":
+            return "200 OK", ""
+        return _unauthorized("n1")
+
+    registrar = _Registrar(respond)
+    client = _start_client(registrar)
+    try:
+        client.start()
+        first = registrar.requests[0]
+        assert _nonce(first) is None
+        del registrar.requests[:]
+        assert client.register()
+        assert len(registrar.requests) == 1
+        refresh = registrar.requests[0]
+        assert _nonce(refresh) == "n1"
+        assert _header(refresh, "Call-ID") == _header(first, "Call-ID")
+    finally:
+        client.stop()
+        registrar.close()
+
+
+@pytest.mark.parametrize("stale", [False, True])
+def test_register_refresh_answers_new_nonce_once(stale):
+    nonces = ["n1"]
+
+    def respond(request):
+        if _nonce(request) == nonces[-1]:
+            return "200 OK", ""
+        return _unauthorized(nonces[-1], stale and _nonce(request) is not None)
+
+    registrar = _Registrar(respond)
+    client = _start_client(registrar)
+    try:
+        client.start()
+        nonces.append("n2")
+        del registrar.requests[:]
+        assert client.register()
+        assert [_nonce(r) for r in registrar.requests] == ["n1", "n2"]
+    finally:
+        client.stop()
+        registrar.close()
+
+
+def test_register_gives_up_after_server_errors():
+    registrar = _Registrar(lambda request: ("500 Server Internal Error", ""))
+    client = _start_client(registrar)
+    try:
+        with pytest.raises(InvalidAccountInfoError):
+            client.start()
+        assert len(registrar.requests) == _REGISTER_ATTEMPTS
+    finally:
+        client.stop()
+        registrar.close()